@@ -1,15 +1,9 @@
 import streamlit as st
-import pandas as pd
-from io import BytesIO
-from datetime import datetime
-from fpdf import FPDF
+from credit_core import load_logo, try_load_limits, load_sic, get_required_approver, export_pdf
 
 # --- Page Setup ---
 st.set_page_config(page_title="Dyce Contract Decision Engine V24", layout="wide")
 VERSION = "2.4 - July 2025"
-LOGO_PATH = "DYCE-DARK BG.png"
-CONFIG_URL = "https://raw.githubusercontent.com/ChrisBeardsmore/Credit/main/Credit_Decision_Config_Template.xlsx"
-SIC_CODES_URL = "https://raw.githubusercontent.com/ChrisBeardsmore/Gas-Pricing/main/Sic%20Codes.xlsx"
 
 # --- Styles ---
 st.markdown("""
@@ -29,76 +23,49 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-st.image(LOGO_PATH, width=200)
+st.image(load_logo(), width=200)
 st.title(f"\u26a1 Dyce Contract Decision Engine V24 ({VERSION})")
 
 # --- Load Config & SIC ---
-@st.cache_data
-def load_config():
-    return pd.read_excel(CONFIG_URL, sheet_name=None)
-
-@st.cache_data
-def load_sic():
-    df = pd.read_excel(SIC_CODES_URL)
-    df['SIC_Code'] = df['SIC_Code'].astype(str).str.strip()
-    return df
-
-config = load_config()
-limits_df = config['ApprovalMatrix']
-sic_df = load_sic()
+limits, config_error = try_load_limits()
+if limits is None:
+    st.error(f"Could not load the approval matrix config: {config_error}")
+    st.stop()
+sic_map = load_sic()
 
 # --- Inputs ---
-st.header("1️⃣ Business Details")
-company_name = st.text_input("Company Name")
-creditsafe_score = st.number_input("Creditsafe Score", 0, 100)
-recommended_limit = st.number_input("Creditsafe Recommended Limit (£)", 0.0)
-years_trading = st.number_input("Years Trading", 0, 100)
-smet_compatible = st.selectbox("Is Meter SMET-Compatible?", ["Yes", "No"])
-has_ccjs = st.selectbox("Any CCJs or Defaults?", ["Yes", "No"])
-payment_terms = st.selectbox("Requested Payment Terms", ["7 Days Direct Debit", "14 Days DD", "14 Days BACS", "28 Days BACS"], index=0)
-contract_value = st.number_input("Total Contract Value (£)", 0.0)
-annual_volume = st.number_input("Estimated Annual Volume (kWh)", 0.0)
-contract_term = st.number_input("Contract Term (Years)", 1, 200)
-number_of_sites = st.number_input("Number of Sites", 1, 200)
-
-st.header("2️⃣ Pricing Details")
-unit_margin = st.number_input("Unit Margin (p/kWh)", 0.0)
-uplift_standing = st.number_input("Broker Uplift - Standing Charge (p/day)", 0.0)
-uplift_unit = st.number_input("Broker Uplift - Unit Rate (p/kWh)", 0.0)
-
-st.header("3️⃣ SIC Code")
-sic_code = st.text_input("Enter SIC Code").strip()
-sic_description, sic_risk = "Unknown", "Medium"
-
-if sic_code:
-    match = sic_df[sic_df['SIC_Code'] == sic_code]
-    if not match.empty:
-        sic_description = match.iloc[0]['SIC_Description']
-        sic_risk = match.iloc[0]['Typical_Risk_Rating']
-        st.markdown(f"**SIC Description:** {sic_description}")
-        st.markdown(f"**Risk Rating:** {sic_risk}")
-    else:
-        sic_risk = st.selectbox("Manual Risk Rating", ["Low", "Medium", "High", "Very High"], index=1)
+with st.form("decision_form"):
+    st.header("1️⃣ Business Details")
+    company_name = st.text_input("Company Name", key="company_name")
+    creditsafe_score = st.number_input("Creditsafe Score", 0, 100, key="creditsafe_score")
+    recommended_limit = st.number_input("Creditsafe Recommended Limit (£)", 0.0, key="recommended_limit")
+    years_trading = st.number_input("Years Trading", 0, 100, key="years_trading")
+    smet_compatible = st.selectbox("Is Meter SMET-Compatible?", ["Yes", "No"], key="smet_compatible")
+    has_ccjs = st.selectbox("Any CCJs or Defaults?", ["Yes", "No"], key="has_ccjs")
+    payment_terms = st.selectbox("Requested Payment Terms", ["7 Days Direct Debit", "14 Days DD", "14 Days BACS", "28 Days BACS"], index=0, key="payment_terms")
+    contract_value = st.number_input("Total Contract Value (£)", 0.0, key="contract_value")
+    annual_volume = st.number_input("Estimated Annual Volume (kWh)", 0.0, key="annual_volume")
+    contract_term = st.number_input("Contract Term (Years)", 1, 200, key="contract_term")
+    number_of_sites = st.number_input("Number of Sites", 1, 200, key="number_of_sites")
+
+    st.header("2️⃣ Pricing Details")
+    unit_margin = st.number_input("Unit Margin (p/kWh)", 0.0, key="unit_margin")
+    uplift_standing = st.number_input("Broker Uplift - Standing Charge (p/day)", 0.0, key="uplift_standing")
+    uplift_unit = st.number_input("Broker Uplift - Unit Rate (p/kWh)", 0.0, key="uplift_unit")
+
+    st.header("3️⃣ SIC Code")
+    sic_code = st.text_input("Enter SIC Code", key="sic_code").strip()
+    manual_risk = st.selectbox("Manual Risk Rating (used if SIC code is not found)", ["Low", "Medium", "High", "Very High"], index=1, key="manual_risk")
+
+    submitted = st.form_submit_button("Run Decision Engine")
 
 # --- Decision Engine ---
-def get_required_approver(sites, spend, volume):
-    for _, row in limits_df.iterrows():
-        try:
-            max_sites = float('inf') if str(row['Max Sites']).strip().startswith('>') else float(row['Max Sites'])
-            max_spend = float('inf') if str(row['Max Spend (£)']).strip().startswith('>') else float(str(row['Max Spend (£)']).replace('£','').replace(',',''))
-            max_volume = float('inf') if str(row['Max Volume (kWh)']).strip().startswith('>') else float(str(row['Max Volume (kWh)']).replace(',',''))
-
-            if (
-                float(sites) <= max_sites and
-                float(spend) <= max_spend and
-                float(volume) <= max_volume
-            ):
-                return row['Role']
-        except Exception:
-            continue
-    return "Managing Director"
-
-def run_decision():
+def run_decision(
+    creditsafe_score, recommended_limit, years_trading, smet_compatible,
+    has_ccjs, payment_terms, contract_value, annual_volume,
+    contract_term, number_of_sites, unit_margin, uplift_standing,
+    uplift_unit, sic_risk
+):
     reasons = []
     decision = "Approved"
     approver = None
@@ -133,58 +100,27 @@ def run_decision():
         if years_trading < 1:
             reasons.append("Referral: Insufficient trading history.")
 
-        approver = get_required_approver(number_of_sites, contract_value, annual_volume)
+        approver = get_required_approver(limits, number_of_sites, contract_value, annual_volume)
 
     return decision, approver if decision != "Declined" else None, reasons
 
-# --- PDF Export ---
-class PDF(FPDF):
-    def header(self):
-        self.image(LOGO_PATH, x=10, y=8, w=50)
-        self.ln(35)
-    def footer(self):
-        self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
-        self.set_text_color(15, 42, 52)
-        self.cell(0, 10, f'Report generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', 0, 0, 'C')
-
-def export_pdf(data, decision, approver, reasons):
-    pdf = PDF()
-    pdf.add_page()
-    pdf.set_font("Arial", 'B', 14)
-    pdf.set_text_color(15, 42, 52)
-    pdf.cell(0, 10, "Dyce Credit Decision Report", ln=True)
-
-    pdf.set_font("Arial", '', 12)
-    pdf.ln(5)
-    for k, v in data.items():
-        if "£" in k:
-            pdf.cell(0, 10, f"{k}: £{v:,.2f}", ln=True)
-        else:
-            pdf.cell(0, 10, f"{k}: {v}", ln=True)
-
-    pdf.ln(5)
-    pdf.cell(0, 10, f"Decision: {decision}", ln=True)
-    if approver:
-        pdf.cell(0, 10, f"Approver Required: {approver}", ln=True)
-
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Reasons / Stipulations:", ln=True)
-    pdf.set_font("Arial", '', 12)
-    for r in reasons:
-        pdf.multi_cell(0, 10, f"- {r}")
-
-    buffer = BytesIO()
-    pdf_bytes = pdf.output(dest='S').encode('latin1')
-    buffer.write(pdf_bytes)
-    buffer.seek(0)
-    return buffer
-
 # --- Run Decision ---
-if st.button("Run Decision Engine"):
-    decision, approver, reasons = run_decision()
+if submitted:
+    sic_description, sic_risk = "Unknown", manual_risk
+    hit = sic_map.get(sic_code) if sic_code else None
+    if hit:
+        sic_description, sic_risk = hit
+
+    decision, approver, reasons = run_decision(
+        creditsafe_score, recommended_limit, years_trading, smet_compatible,
+        has_ccjs, payment_terms, contract_value, annual_volume,
+        contract_term, number_of_sites, unit_margin, uplift_standing,
+        uplift_unit, sic_risk
+    )
     st.subheader("Decision Result")
+    if hit:
+        st.markdown(f"**SIC Description:** {sic_description}")
+        st.markdown(f"**Risk Rating:** {sic_risk}")
     st.markdown(f"**Final Decision:** {decision}")
     if approver:
         st.markdown(f"**Required Approver:** {approver}")
@@ -206,5 +142,9 @@ if st.button("Run Decision Engine"):
         "Risk Rating": sic_risk
     }
 
-    pdf_file = export_pdf(result_data, decision, approver, reasons)
-    st.download_button("Download PDF Report", pdf_file, "Credit_Decision_Report.pdf", "application/pdf")
+    # Only rebuild the PDF when the inputs behind it have changed
+    pdf_key = (tuple(result_data.items()), decision, approver, tuple(reasons))
+    if st.session_state.get("pdf_key") != pdf_key:
+        st.session_state["pdf_key"] = pdf_key
+        st.session_state["pdf_file"] = export_pdf(result_data, decision, approver, reasons).getvalue()
+    st.download_button("Download PDF Report", st.session_state["pdf_file"], "Credit_Decision_Report.pdf", "application/pdf")
@@ -0,0 +1,140 @@
+# Shared loaders and PDF export for the Dyce decision engine apps
+import streamlit as st
+import pandas as pd
+import numpy as np
+import requests
+from io import BytesIO
+from datetime import datetime
+from fpdf import FPDF
+
+LOGO_PATH = "DYCE-DARK BG.png"
+CONFIG_URL = "https://raw.githubusercontent.com/ChrisBeardsmore/Credit/main/Credit_Decision_Config_Template.xlsx"
+SIC_CODES_URL = "https://raw.githubusercontent.com/ChrisBeardsmore/Gas-Pricing/main/Sic%20Codes.xlsx"
+
+# --- Logo ---
+@st.cache_resource
+def load_logo():
+    with open(LOGO_PATH, 'rb') as logo_file:
+        return logo_file.read()
+
+# --- Load Config ---
+# Config stays in memory with a daily expiry so workbook edits are picked up
+@st.cache_resource(ttl=86400)
+def fetch_config_bytes():
+    response = requests.get(CONFIG_URL, timeout=10)
+    response.raise_for_status()
+    return response.content
+
+@st.cache_data(ttl=86400)
+def load_config():
+    return pd.read_excel(BytesIO(fetch_config_bytes()), sheet_name="ApprovalMatrix", engine="calamine")
+
+def parse_limit(value):
+    text = str(value).strip()
+    if text.startswith('>'):
+        return float('inf')
+    try:
+        return float(text.replace('£', '').replace(',', ''))
+    except ValueError:
+        return float('nan')  # never matches, same as skipping the row
+
+def limit_column(limits_df, column):
+    # A missing column never matches, so the lookup falls back to Managing Director
+    if column not in limits_df:
+        return np.full(len(limits_df), np.nan)
+    return limits_df[column].map(parse_limit).to_numpy(dtype=float)
+
+@st.cache_data(ttl=86400)
+def load_limits():
+    limits_df = load_config()
+    max_sites = limit_column(limits_df, 'Max Sites')
+    return {
+        'max_sites': max_sites,
+        # Column names as used in Credit_Decision_Config_Template.xlsx
+        'max_spend': limit_column(limits_df, 'Max Annual Spend'),
+        'max_volume': limit_column(limits_df, 'Max Annual Volume (kWh)'),
+        'roles': limits_df['Role'].to_numpy() if 'Role' in limits_df else np.full(len(limits_df), "Managing Director"),
+        # Rows are matched in sheet order, so only binary search when that order is ascending
+        'sites_sorted': bool(np.all(max_sites[1:] >= max_sites[:-1])),
+    }
+
+# Failures are cached for a minute so an outage isn't refetched on every rerun
+@st.cache_data(ttl=60)
+def try_load_limits():
+    try:
+        return load_limits(), None
+    except Exception as e:
+        return None, str(e)
+
+def get_required_approver(limits, sites, spend, volume):
+    start = np.searchsorted(limits['max_sites'], float(sites)) if limits['sites_sorted'] else 0
+    mask = (
+        (float(sites) <= limits['max_sites'][start:]) &
+        (float(spend) <= limits['max_spend'][start:]) &
+        (float(volume) <= limits['max_volume'][start:])
+    )
+    if mask.any():
+        return limits['roles'][start + mask.argmax()]
+    return "Managing Director"
+
+# --- Load SIC Codes ---
+@st.cache_data(persist="disk")
+def parse_sic():
+    df = pd.read_excel(SIC_CODES_URL, engine="calamine")
+    df['SIC_Code'] = df['SIC_Code'].astype('string[pyarrow]').str.strip()
+    df = df.drop_duplicates('SIC_Code')
+    return dict(zip(df['SIC_Code'], zip(df['SIC_Description'], df['Typical_Risk_Rating'])))
+
+# Shared read-only: avoids copying the SIC map out of cache_data on every rerun
+@st.cache_resource
+def load_sic():
+    return parse_sic()
+
+# --- PDF Export ---
+class PDF(FPDF):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.generated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def header(self):
+        self.image(BytesIO(load_logo()), x=10, y=8, w=50)
+        self.ln(35)
+    def footer(self):
+        self.set_y(-15)
+        self.set_font('helvetica', 'I', 8)
+        self.set_text_color(15, 42, 52)
+        self.cell(0, 10, f'Report generated on {self.generated_at}', align='C')
+
+def export_pdf(data, decision, approver, reasons, details=None):
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_font("helvetica", 'B', 14)
+    pdf.set_text_color(15, 42, 52)
+    pdf.cell(0, 10, "Dyce Credit Decision Report", new_x="LMARGIN", new_y="NEXT")
+
+    pdf.set_font("helvetica", '', 12)
+    # Optional lines above the report data, e.g. username and date
+    if details:
+        pdf.multi_cell(0, 10, "\n".join(f"{k}: {v}" for k, v in details.items()), new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(5)
+    pdf.multi_cell(0, 10, "\n".join(
+        f"{k}: £{v:,.2f}" if "£" in k else f"{k}: {v}"
+        for k, v in data.items()
+    ), new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(5)
+    pdf.cell(0, 10, f"Decision: {decision}", new_x="LMARGIN", new_y="NEXT")
+    if approver:
+        pdf.cell(0, 10, f"Approver Required: {approver}", new_x="LMARGIN", new_y="NEXT")
+
+    pdf.ln(5)
+    pdf.set_font("helvetica", 'B', 12)
+    pdf.cell(0, 10, "Reasons / Stipulations:", new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("helvetica", '', 12)
+    if reasons:
+        pdf.multi_cell(0, 10, "\n".join(f"- {r}" for r in reasons), new_x="LMARGIN", new_y="NEXT")
+
+    buffer = BytesIO()
+    pdf.output(buffer)
+    buffer.seek(0)
+    return buffer